@@ -1,7 +1,47 @@
 """Entry point: python -m havona_mcp"""
+import asyncio
+import logging
 import sys
-from .server import mcp
+from typing import Callable, Optional
 
-if __name__ == "__main__":
+import anyio
+
+from .server import _get_client, mcp
+
+log = logging.getLogger(__name__)
+
+
+def _fast_loop_factory() -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """Return uvloop's (winloop's on Windows) loop constructor if installed."""
+    try:
+        if sys.platform == "win32":
+            from winloop import new_event_loop
+        else:
+            from uvloop import new_event_loop
+    except ImportError:
+        return None
+    return new_event_loop
+
+
+def main() -> None:
     transport = "sse" if "--sse" in sys.argv else "stdio"
-    mcp.run(transport=transport)
+
+    # Authenticate up front so the first tool call doesn't pay for the token
+    # exchange. Config errors are left for the tools to report.
+    try:
+        _get_client()
+    except Exception as e:
+        log.warning("Havona client warm-up failed: %s", e)
+
+    # stdio is bound by the host's pipe, not the event loop, so only SSE
+    # gets the faster loop. Passing the factory avoids the deprecated
+    # global event loop policy.
+    loop_factory = _fast_loop_factory() if transport == "sse" else None
+    if loop_factory is not None:
+        anyio.run(mcp.run_sse_async, backend_options={"loop_factory": loop_factory})
+    else:
+        mcp.run(transport=transport)
+
+
+if __name__ == "__main__":
+    main()
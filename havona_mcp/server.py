@@ -13,19 +13,31 @@ Env vars:
     For M2M (takes priority if set):
     AUTH0_M2M_CLIENT_ID / AUTH0_M2M_CLIENT_SECRET
 
+    HAVONA_MAX_CONCURRENT_CALLS  tool calls run against the SDK at once (default 1)
+    HAVONA_MAX_DOCUMENT_MB       extract_trade_document size limit (default 500)
+
 Usage:
     python -m havona_mcp        # stdio (Claude Desktop / Cursor)
     python -m havona_mcp --sse  # SSE transport
 """
 
+import datetime
+import functools
 import json
+import logging
 import os
-from typing import Optional
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
 
+import anyio.to_thread
+import orjson
 from mcp.server.fastmcp import FastMCP
 
 from havona_sdk import HavonaClient, HavonaError
 
+log = logging.getLogger(__name__)
+
 mcp = FastMCP(
     name="havona",
     instructions=(
@@ -36,6 +48,7 @@ mcp = FastMCP(
 )
 
 _client: Optional[HavonaClient] = None
+_client_lock = threading.Lock()
 
 
 def _get_client() -> HavonaClient:
@@ -43,37 +56,205 @@ def _get_client() -> HavonaClient:
     if _client is not None:
         return _client
 
-    base_url = os.environ.get("HAVONA_API_URL", "").rstrip("/")
-    if not base_url:
-        raise RuntimeError("HAVONA_API_URL is required")
+    # Building the client performs the Auth0 token exchange; make sure
+    # concurrent first calls only do that once.
+    with _client_lock:
+        if _client is None:
+            _client = _build_client()
+    return _client
 
-    m2m_id = os.environ.get("AUTH0_M2M_CLIENT_ID")
-    m2m_secret = os.environ.get("AUTH0_M2M_CLIENT_SECRET")
-    if m2m_id and m2m_secret:
-        _client = HavonaClient.from_m2m(
+
+def _client_factory() -> Callable[[], HavonaClient]:
+    """Resolve auth config from the environment once, at import."""
+    env = os.environ
+    base_url = env.get("HAVONA_API_URL", "").rstrip("/")
+    try:
+        if not base_url:
+            raise KeyError("HAVONA_API_URL")
+
+        m2m_id = env.get("AUTH0_M2M_CLIENT_ID")
+        m2m_secret = env.get("AUTH0_M2M_CLIENT_SECRET")
+        if m2m_id and m2m_secret:
+            return functools.partial(
+                HavonaClient.from_m2m,
+                base_url=base_url,
+                auth0_domain=env["AUTH0_DOMAIN"],
+                auth0_audience=env["AUTH0_AUDIENCE"],
+                auth0_client_id=m2m_id,
+                auth0_client_secret=m2m_secret,
+            )
+        return functools.partial(
+            HavonaClient.from_credentials,
             base_url=base_url,
-            auth0_domain=os.environ["AUTH0_DOMAIN"],
-            auth0_audience=os.environ["AUTH0_AUDIENCE"],
-            auth0_client_id=m2m_id,
-            auth0_client_secret=m2m_secret,
+            auth0_domain=env["AUTH0_DOMAIN"],
+            auth0_audience=env["AUTH0_AUDIENCE"],
+            auth0_client_id=env["AUTH0_CLIENT_ID"],
+            username=env["HAVONA_EMAIL"],
+            password=env["HAVONA_PASSWORD"],
         )
-    else:
-        _client = HavonaClient.from_credentials(
-            base_url=base_url,
-            auth0_domain=os.environ["AUTH0_DOMAIN"],
-            auth0_audience=os.environ["AUTH0_AUDIENCE"],
-            auth0_client_id=os.environ["AUTH0_CLIENT_ID"],
-            username=os.environ["HAVONA_EMAIL"],
-            password=os.environ["HAVONA_PASSWORD"],
+    except KeyError as e:
+        message = f"{e.args[0]} is required"
+
+    # Don't fail at import: tools report the missing variable when called.
+    def _missing_config() -> HavonaClient:
+        raise RuntimeError(message)
+
+    return _missing_config
+
+
+_build_client = _client_factory()
+
+
+def _json_default(obj: Any) -> str:
+    # Same output as orjson's native handling: ISO 8601 for dates and times,
+    # str() for anything else (UUIDs, Decimals) the SDK passes through in extra fields
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _dumps(obj: Any) -> str:
+    # Note orjson writes NaN and Infinity as null, where stdlib json wrote NaN
+    try:
+        return orjson.dumps(obj, default=_json_default).decode()
+    except orjson.JSONEncodeError:
+        # orjson rejects integers beyond 64 bits (e.g. uint256 wei amounts)
+        return json.dumps(
+            obj, default=_json_default, separators=(",", ":"), ensure_ascii=False
         )
-    return _client
 
 
 def _err(e: Exception) -> str:
-    return json.dumps({"error": str(e), "type": type(e).__name__})
+    body = {"error": str(e), "type": e.__class__.__name__}
+    # Pass through a machine-readable code when the exception carries one
+    code = getattr(e, "code", None)
+    if code is not None:
+        body["code"] = code
+    return _dumps(body)
+
+
+# Seconds to reuse responses from read tools whose data changes slowly.
+_BLOCKCHAIN_STATUS_TTL = 30.0
+_DOCUMENT_TYPES_TTL = 300.0
+_AGENTS_TTL = 5.0
+
+_cache: dict[str, tuple[float, str]] = {}
 
 
-@mcp.tool()
+def _cached(key: str, ttl: float, build: Callable[[], str]) -> str:
+    """
+    Return the serialized response stored under key, calling build() to
+    refresh it once it is older than ttl seconds.
+
+    Exceptions from build() propagate and are never cached.
+    """
+    now = time.monotonic()
+    hit = _cache.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    payload = build()
+    _cache[key] = (now + ttl, payload)
+    return payload
+
+
+def _positive_int_env(name: str, default: int) -> int:
+    """Read a positive integer setting, falling back to default on bad input."""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value < 1:
+        # Don't fail at import, same as the client config above
+        log.warning("%s must be a positive integer; using %d", name, default)
+        return default
+    return value
+
+
+# Max tool calls using the shared HavonaClient at once. The SDK makes no
+# thread-safety promise (token refresh, HTTP session), so the default
+# keeps calls one at a time; raise it only for an SDK known to be safe.
+_sdk_limiter = anyio.CapacityLimiter(_positive_int_env("HAVONA_MAX_CONCURRENT_CALLS", 1))
+
+
+def _offload(fn: Callable[..., str]) -> Callable[..., Awaitable[str]]:
+    """
+    Run a blocking SDK-backed tool in a worker thread.
+
+    FastMCP calls sync tools directly on the event loop, so one slow API
+    round-trip would stall every other request. Offloaded calls leave the
+    loop free, and up to HAVONA_MAX_CONCURRENT_CALLS of them overlap their
+    HTTP latency. With the default of 1 they still run one after another,
+    so concurrent calls take the sum of their latencies, not the max.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> str:
+        return await anyio.to_thread.run_sync(
+            functools.partial(fn, *args, **kwargs), limiter=_sdk_limiter
+        )
+
+    return wrapper
+
+
+def _tool(fn: Callable[..., str]) -> Callable[..., Awaitable[str]]:
+    """Register fn as an MCP tool returning pre-serialized JSON text."""
+    return mcp.tool(structured_output=False)(_offload(fn))
+
+
+def _cached_tool(fn: Callable[..., str]) -> Callable[..., Awaitable[str]]:
+    """
+    Like _tool, for read tools that store their response with
+    _cached(<tool name>, ...).
+
+    A fresh cache entry is returned straight from the event loop, so a hit
+    never waits for a worker thread or an _sdk_limiter slot. Only misses
+    are offloaded.
+    """
+    key = fn.__name__
+    offloaded = _offload(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> str:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] > time.monotonic():
+            return hit[1]
+        return await offloaded(*args, **kwargs)
+
+    return mcp.tool(structured_output=False)(wrapper)
+
+
+# Row projections for the list tools. Fields are plain scalars, so orjson
+# encodes the rows natively.
+
+def _trade_row(t) -> dict:
+    return {
+        "id": t.id,
+        "contractNo": t.contract_no,
+        "status": t.status,
+        "contractType": t.contract_type,
+        "blockchainStatus": t.blockchain_status,
+        "txHash": t.tx_hash,
+    }
+
+
+def _agent_row(a) -> dict:
+    return {
+        "id": a.id,
+        "name": a.name,
+        "agentType": a.agent_type,
+        "wallet": a.wallet,
+        "status": a.status,
+        "metadataUri": a.metadata_uri,
+    }
+
+
+def _document_type_row(t) -> dict:
+    return {"id": t.id, "name": t.name, "description": t.description}
+
+
+@_tool
 def list_trades(limit: int = 20) -> str:
     """
     List trade contracts visible to the authenticated user.
@@ -82,43 +263,42 @@ def list_trades(limit: int = 20) -> str:
     """
     try:
         trades = _get_client().trades.list(limit=limit)
-        return json.dumps([
-            {
-                "id": t.id,
-                "contractNo": t.contract_no,
-                "status": t.status,
-                "contractType": t.contract_type,
-                "blockchainStatus": t.blockchain_status,
-                "txHash": t.tx_hash,
-            }
-            for t in trades
-        ])
+        return _dumps([_trade_row(t) for t in trades])
     except Exception as e:
         return _err(e)
 
 
-@mcp.tool()
+@_tool
 def get_trade(trade_id: str) -> str:
     """
     Fetch a single trade contract by its ID.
     """
     try:
         t = _get_client().trades.get(trade_id)
-        return json.dumps({
-            "id": t.id,
-            "contractNo": t.contract_no,
-            "status": t.status,
-            "contractType": t.contract_type,
-            "blockchainStatus": t.blockchain_status,
-            "txHash": t.tx_hash,
-            "blockNumber": t.block_number,
-            **t.extra,
-        })
+        row = _trade_row(t)
+        row["blockNumber"] = t.block_number
+        row.update(t.extra)
+        return _dumps(row)
     except HavonaError as e:
         return _err(e)
 
 
-@mcp.tool()
+# Optional create_trade arguments, in signature order, as the API field names.
+_CREATE_TRADE_FIELDS = (
+    "contractType",
+    "sellerId",
+    "buyerId",
+    "commodity",
+    "quantity",
+    "unit",
+    "currency",
+    "totalValue",
+    "originCountry",
+    "destinationCountry",
+)
+
+
+@_tool
 def create_trade(
     contract_no: str,
     status: str = "DRAFT",
@@ -143,23 +323,16 @@ def create_trade(
     """
     try:
         kwargs: dict = {"contract_no": contract_no, "status": status}
-        for k, v in [
-            ("contractType", contract_type),
-            ("sellerId", seller_id),
-            ("buyerId", buyer_id),
-            ("commodity", commodity),
-            ("quantity", quantity),
-            ("unit", unit),
-            ("currency", currency),
-            ("totalValue", total_value),
-            ("originCountry", origin_country),
-            ("destinationCountry", destination_country),
-        ]:
-            if v is not None:
-                kwargs[k] = v
+        values = (
+            contract_type, seller_id, buyer_id, commodity, quantity,
+            unit, currency, total_value, origin_country, destination_country,
+        )
+        kwargs.update(
+            (k, v) for k, v in zip(_CREATE_TRADE_FIELDS, values) if v is not None
+        )
 
         trade = _get_client().trades.create(**kwargs)
-        return json.dumps({
+        return _dumps({
             "id": trade.id,
             "contractNo": trade.contract_no,
             "status": trade.status,
@@ -169,39 +342,42 @@ def create_trade(
         return _err(e)
 
 
-@mcp.tool()
+@_tool
 def update_trade_status(trade_id: str, status: str) -> str:
     """
     Update the status of a trade contract (e.g. DRAFT → ACTIVE → COMPLETED).
     """
     try:
         result = _get_client().trades.update(trade_id, status=status)
-        return json.dumps(result)
+        return _dumps(result)
     except HavonaError as e:
         return _err(e)
 
 
-@mcp.tool()
+@_cached_tool
 def blockchain_status() -> str:
     """
     Check whether the platform is connected to its confidential EVM chain.
 
     Returns connected, chainId, network, and the deployed contract address.
     """
-    try:
+    def build() -> str:
         s = _get_client().blockchain.status()
-        return json.dumps({
+        return _dumps({
             "connected": s.connected,
             "chainId": s.chain_id,
             "network": s.network,
             "contractAddress": s.contract_address,
             **s.extra,
         })
+
+    try:
+        return _cached("blockchain_status", _BLOCKCHAIN_STATUS_TTL, build)
     except HavonaError as e:
         return _err(e)
 
 
-@mcp.tool()
+@_tool
 def get_trade_blockchain_record(trade_id: str) -> str:
     """
     Get the on-chain persistence record for a trade.
@@ -210,7 +386,7 @@ def get_trade_blockchain_record(trade_id: str) -> str:
     """
     try:
         p = _get_client().blockchain.get_persistence(trade_id)
-        return json.dumps({
+        return _dumps({
             "recordId": p.record_id,
             "status": p.status,
             "txHash": p.tx_hash,
@@ -222,31 +398,24 @@ def get_trade_blockchain_record(trade_id: str) -> str:
         return _err(e)
 
 
-@mcp.tool()
+@_cached_tool
 def list_agents() -> str:
     """
     List ERC-8004 AI agents registered on the platform.
 
     Returns an empty list if the blockchain connection is unavailable.
     """
-    try:
+    def build() -> str:
         agents = _get_client().agents.list()
-        return json.dumps([
-            {
-                "id": a.id,
-                "name": a.name,
-                "agentType": a.agent_type,
-                "wallet": a.wallet,
-                "status": a.status,
-                "metadataUri": a.metadata_uri,
-            }
-            for a in agents
-        ])
+        return _dumps([_agent_row(a) for a in agents])
+
+    try:
+        return _cached("list_agents", _AGENTS_TTL, build)
     except HavonaError as e:
         return _err(e)
 
 
-@mcp.tool()
+@_tool
 def get_agent_reputation(agent_id: int) -> str:
     """
     Get the aggregated reputation score for an agent.
@@ -255,7 +424,7 @@ def get_agent_reputation(agent_id: int) -> str:
     """
     try:
         rep = _get_client().agents.get_reputation(agent_id)
-        return json.dumps({
+        return _dumps({
             "agentId": rep.agent_id,
             "totalFeedback": rep.total_feedback,
             "averageScore": rep.average_score,
@@ -265,24 +434,29 @@ def get_agent_reputation(agent_id: int) -> str:
         return _err(e)
 
 
-@mcp.tool()
+@_cached_tool
 def list_supported_document_types() -> str:
     """
     List ETR document types available for AI extraction.
 
     Typically includes COMMERCIAL_INVOICE, BILL_OF_LADING, CERTIFICATE_OF_ORIGIN.
     """
-    try:
+    def build() -> str:
         types = _get_client().documents.supported_types()
-        return json.dumps([
-            {"id": t.id, "name": t.name, "description": t.description}
-            for t in types
-        ])
+        return _dumps([_document_type_row(t) for t in types])
+
+    try:
+        return _cached("list_supported_document_types", _DOCUMENT_TYPES_TTL, build)
     except HavonaError as e:
         return _err(e)
 
 
-@mcp.tool()
+# Reject absurdly large documents before uploading anything. Real scans are
+# tens of MB, so the default only catches mistakes.
+_MAX_DOCUMENT_BYTES = _positive_int_env("HAVONA_MAX_DOCUMENT_MB", 500) * 1024 * 1024
+
+
+@_tool
 def extract_trade_document(file_path: str, document_type: str) -> str:
     """
     Extract structured fields from an ETR document PDF using Gemini AI.
@@ -292,9 +466,18 @@ def extract_trade_document(file_path: str, document_type: str) -> str:
     document_type: COMMERCIAL_INVOICE | BILL_OF_LADING | CERTIFICATE_OF_ORIGIN
     file_path: absolute path to the PDF on this machine
     """
+    try:
+        size = os.path.getsize(file_path)
+    except OSError as e:
+        return _err(e)
+    if size > _MAX_DOCUMENT_BYTES:
+        return _err(ValueError(
+            f"{file_path} is {size} bytes; the limit is {_MAX_DOCUMENT_BYTES}"
+        ))
+
     try:
         result = _get_client().documents.extract(file_path, document_type)
-        return json.dumps({
+        return _dumps({
             "documentType": result.document_type,
             "fields": result.fields,
             "confidence": result.confidence,
@@ -304,21 +487,30 @@ def extract_trade_document(file_path: str, document_type: str) -> str:
         return _err(e)
 
 
-@mcp.tool()
+# Refuse to parse graphql_query variables beyond this length.
+_MAX_VARIABLES_CHARS = 256 * 1024
+
+
+@_tool
 def graphql_query(query: str, variables: Optional[str] = None) -> str:
     """
     Run a raw GraphQL query against the Havona API.
 
-    variables: optional JSON string, e.g. '{"id": "abc123"}'
+    variables: optional JSON string (at most 256K characters), e.g. '{"id": "abc123"}'
 
     Example:
         query = "query { queryTradeContract(first: 5) { id contractNo status } }"
     """
+    if variables and len(variables) > _MAX_VARIABLES_CHARS:
+        return _err(ValueError(
+            f"variables is {len(variables)} characters; the limit is {_MAX_VARIABLES_CHARS}"
+        ))
+
     try:
-        vars_dict = json.loads(variables) if variables else None
+        vars_dict = orjson.loads(variables) if variables else None
         data = _get_client().graphql(query, vars_dict)
-        return json.dumps(data)
+        return _dumps(data)
     except HavonaError as e:
         return _err(e)
-    except json.JSONDecodeError as e:
-        return json.dumps({"error": f"Invalid variables JSON: {e}"})
+    except orjson.JSONDecodeError as e:
+        return _dumps({"error": f"Invalid variables JSON: {e}"})